@@ -0,0 +1,277 @@
+"""
+Движок оповещений о курсах валют.
+
+Оповещения хранятся в памяти в отсортированных по порогу списках
+отдельно для каждой валюты, поэтому при изменении курса проверяются
+только пересеченные пороги (bisect), а не все зарегистрированные alerts.
+Оповещения одноразовые: после срабатывания они удаляются.
+above/below, условие которых уже выполнено при регистрации, отклоняются.
+
+Условие 'change' сравнивает текущий курс с первой точкой окна
+window_seconds (история берется из буферов app.stats, поэтому окно -
+одно из WINDOWS: 1h/24h/7d; на каждое изменение курса приходится
+не больше трех бинарных поисков).
+Поэтому движение "вверх и обратно" внутри окна не срабатывает, если
+текущий курс вернулся к начальному.
+"""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+import time
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.database import AsyncSessionLocal
+from app.models import Item
+from app.websocket import manager
+from app.nats_client import nats_client
+from app.stats import WINDOWS, rolling_stats
+
+CONDITIONS = ("above", "below", "change")
+
+
+class AlertAlreadyTriggered(ValueError):
+    """Условие above/below уже выполнено текущим курсом"""
+
+
+@dataclass
+class Alert:
+    id: int
+    client_id: str
+    code: str
+    condition: str
+    threshold: float
+    window_seconds: int = 3600
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class _SortedAlerts:
+    """Alerts, упорядоченные по порогу (параллельные списки ключей и alerts)"""
+
+    def __init__(self):
+        self.keys: List[float] = []
+        self.alerts: List[Alert] = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, alert: Alert):
+        i = bisect_right(self.keys, alert.threshold)
+        self.keys.insert(i, alert.threshold)
+        self.alerts.insert(i, alert)
+
+    def remove(self, alert: Alert) -> bool:
+        i = bisect_left(self.keys, alert.threshold)
+        while i < len(self.keys) and self.keys[i] == alert.threshold:
+            if self.alerts[i] is alert:
+                del self.keys[i]
+                del self.alerts[i]
+                return True
+            i += 1
+        return False
+
+    def pop_range(self, lo: int, hi: int) -> List[Alert]:
+        """Извлекает alerts с индексами [lo, hi)"""
+        if lo >= hi:
+            return []
+        popped = self.alerts[lo:hi]
+        del self.keys[lo:hi]
+        del self.alerts[lo:hi]
+        return popped
+
+
+class AlertEngine:
+    def __init__(self):
+        self._ids = count(1)
+        self.alerts: Dict[int, Alert] = {}
+        self.above: Dict[str, _SortedAlerts] = {}
+        self.below: Dict[str, _SortedAlerts] = {}
+        # code -> window_seconds -> alerts по проценту изменения
+        self.change: Dict[str, Dict[int, _SortedAlerts]] = {}
+        self.last_rates: Dict[str, float] = {}
+
+    def add(self, client_id: str, code: str, condition: str,
+            threshold: float, window_seconds: int = 3600) -> Alert:
+        """Регистрирует новое оповещение"""
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown condition '{condition}'")
+        if condition == "change" and window_seconds not in WINDOWS.values():
+            raise ValueError(
+                f"window_seconds must be one of {sorted(WINDOWS.values())}"
+            )
+
+        code = code.upper()
+        current = self.last_rates.get(code)
+        if current is not None and (
+            (condition == "above" and current > threshold)
+            or (condition == "below" and current < threshold)
+        ):
+            raise AlertAlreadyTriggered(
+                f"{code} is already {condition} {threshold} (current rate {current})"
+            )
+
+        alert = Alert(
+            id=next(self._ids),
+            client_id=client_id,
+            code=code,
+            condition=condition,
+            threshold=threshold,
+            window_seconds=window_seconds
+        )
+        self._bucket(alert).add(alert)
+        self.alerts[alert.id] = alert
+        return alert
+
+    def remove(self, alert_id: int) -> Optional[Alert]:
+        """Удаляет оповещение по ID"""
+        alert = self.alerts.pop(alert_id, None)
+        if alert:
+            self._bucket(alert).remove(alert)
+            self._prune(alert.code)
+        return alert
+
+    def seed_rate(self, code: str, rate: float):
+        """Задает предыдущий курс валюты, если он еще неизвестен"""
+        self.last_rates.setdefault(code.upper(), rate)
+
+    def reset_rate(self, code: str, rate: Optional[float]):
+        """Заменяет предыдущий курс валюты (None - курс неизвестен)"""
+        if rate is None:
+            self.last_rates.pop(code.upper(), None)
+        else:
+            self.last_rates[code.upper()] = rate
+
+    async def seed(self):
+        """Загружает последний курс каждой валюты из БД как базу для above/below"""
+        latest = select(Item.code, func.max(Item.timestamp).label("timestamp")).group_by(
+            Item.code
+        ).subquery()
+        stmt = select(Item.code, Item.value).join(
+            latest,
+            (Item.code == latest.c.code) & (Item.timestamp == latest.c.timestamp)
+        )
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(stmt)
+            rows = result.all()
+
+        for code, value in rows:
+            self.seed_rate(code, value)
+
+        print(f"[Alerts] Загружены последние курсы {len(self.last_rates)} валют")
+
+    def get_alerts(self, client_id: Optional[str] = None) -> List[Alert]:
+        if client_id is None:
+            return list(self.alerts.values())
+        return [a for a in self.alerts.values() if a.client_id == client_id]
+
+    def _bucket(self, alert: Alert) -> _SortedAlerts:
+        if alert.condition == "above":
+            return self.above.setdefault(alert.code, _SortedAlerts())
+        if alert.condition == "below":
+            return self.below.setdefault(alert.code, _SortedAlerts())
+        windows = self.change.setdefault(alert.code, {})
+        return windows.setdefault(alert.window_seconds, _SortedAlerts())
+
+    def _prune(self, code: str):
+        """Удаляет опустевшие списки, чтобы не проверять их при каждом курсе"""
+        for buckets in (self.above, self.below):
+            if code in buckets and not buckets[code]:
+                del buckets[code]
+
+        windows = self.change.get(code)
+        if windows is not None:
+            for window in [w for w, bucket in windows.items() if not bucket]:
+                del windows[window]
+            if not windows:
+                del self.change[code]
+
+    def process_rate(self, code: str, rate: float,
+                     now: Optional[float] = None) -> List[Tuple[Alert, float]]:
+        """
+        Обрабатывает новый курс валюты.
+        Точка уже должна быть добавлена в rolling_stats.
+        Возвращает сработавшие alerts вместе с базовым значением
+        (предыдущий курс или курс начала окна для 'change').
+        """
+        code = code.upper()
+        now = time.time() if now is None else now
+        previous = self.last_rates.get(code)
+        self.last_rates[code] = rate
+
+        triggered: List[Tuple[Alert, float]] = []
+        if previous is not None:
+            above = self.above.get(code)
+            if above and rate > previous:
+                # previous <= threshold < rate
+                lo = bisect_left(above.keys, previous)
+                hi = bisect_left(above.keys, rate)
+                triggered += [(a, previous) for a in above.pop_range(lo, hi)]
+
+            below = self.below.get(code)
+            if below and rate < previous:
+                # rate < threshold <= previous
+                lo = bisect_right(below.keys, rate)
+                hi = bisect_right(below.keys, previous)
+                triggered += [(a, previous) for a in below.pop_range(lo, hi)]
+
+        for window, bucket in self.change.get(code, {}).items():
+            base = rolling_stats.first_value_since(code, now - window)
+            if not base:
+                continue
+            percent = abs(rate - base) / base * 100
+            triggered += [(a, base) for a in bucket.pop_range(0, bisect_left(bucket.keys, percent))]
+
+        for alert, _ in triggered:
+            self.alerts.pop(alert.id, None)
+        if triggered:
+            self._prune(code)
+
+        return triggered
+
+    async def check_rate(self, code: str, rate: float):
+        """Проверяет курс и доставляет сработавшие оповещения (WebSocket + NATS)"""
+        triggered = self.process_rate(code, rate)
+        if not triggered:
+            return triggered
+
+        timestamp = datetime.now().isoformat()
+        by_client: Dict[str, List[dict]] = {}
+        payload = []
+        for alert, base in triggered:
+            data = {
+                "alert_id": alert.id,
+                "client_id": alert.client_id,
+                "code": alert.code,
+                "condition": alert.condition,
+                "threshold": alert.threshold,
+                "base_value": base,
+                "value": rate
+            }
+            if alert.condition == "change":
+                data["window_seconds"] = alert.window_seconds
+            by_client.setdefault(alert.client_id, []).append(data)
+            payload.append(data)
+
+        print(f"[Alerts] {code} = {rate}: сработало {len(triggered)} оповещений")
+
+        for client_id, alerts in by_client.items():
+            await manager.send_to_client(client_id, {
+                "event": "alert_triggered",
+                "alerts": alerts,
+                "timestamp": timestamp
+            })
+
+        await nats_client.publish("items.alerts", {
+            "type": "alert_triggered",
+            "data": {"code": code, "value": rate, "alerts": payload},
+            "timestamp": timestamp
+        })
+
+        return triggered
+
+alert_engine = AlertEngine()
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+
+from app.alerts import alert_engine, AlertAlreadyTriggered
+from app.schemas import AlertCreate, AlertResponse
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+@router.get("/", response_model=List[AlertResponse])
+async def get_alerts(client_id: Optional[str] = None):
+    """Получить список активных оповещений (опционально по client_id)"""
+    return alert_engine.get_alerts(client_id)
+
+@router.post("/", response_model=AlertResponse, status_code=201)
+async def create_alert(alert: AlertCreate):
+    """
+    Зарегистрировать оповещение:
+    - above / below - курс пересек порог threshold
+    - change - текущий курс отличается от первого курса в окне
+      window_seconds (3600, 86400 или 604800) более чем на threshold %
+    Сработавшее оповещение приходит по WebSocket (/ws/items?client_id=...)
+    и публикуется в NATS (items.alerts), после чего удаляется.
+    Если условие above/below уже выполнено текущим курсом - ответ 409.
+    """
+    if alert.condition == "change" and alert.threshold <= 0:
+        raise HTTPException(status_code=422, detail="Threshold for 'change' must be positive")
+
+    try:
+        return alert_engine.add(**alert.dict())
+    except AlertAlreadyTriggered as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.delete("/{alert_id}", status_code=204)
+async def delete_alert(alert_id: int):
+    """Удалить оповещение"""
+    if not alert_engine.remove(alert_id):
+        raise HTTPException(status_code=404, detail="Alert not found")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
@@ -6,7 +6,9 @@ from datetime import datetime
 
 from app.database import get_db
 from app.models import Item
-from app.schemas import ItemResponse, ItemCreate, ItemUpdate
+from app.schemas import ItemResponse, ItemCreate, ItemUpdate, CurrencyStats, ChangesResponse
+from app.stats import rolling_stats
+from app.changes import change_log
 
 router = APIRouter(prefix="/items", tags=["items"])
 
@@ -17,6 +19,27 @@ async def get_items(db: AsyncSession = Depends(get_db)):
     items = result.scalars().all()
     return items
 
+@router.get("/changes", response_model=ChangesResponse)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    wait: float = Query(0, ge=0, le=60)
+):
+    """
+    Журнал изменений items (create/update/delete/background_insert) новее версии since.
+    Если изменений нет, запрос ждет до wait секунд (long-poll).
+    reset=true означает, что журнал не покрывает версию клиента
+    (первый запрос с since=0, отставание или перезапуск сервера):
+    нужно заново загрузить GET /items/ и продолжить с возвращенной version.
+    """
+    await change_log.wait(since, wait)
+    changes, reset = change_log.since(since)
+    
+    return {
+        "version": change_log.version,
+        "reset": reset,
+        "changes": changes
+    }
+
 @router.get("/{item_id}", response_model=ItemResponse)
 async def get_item(item_id: int, db: AsyncSession = Depends(get_db)):
     """Получить item по ID"""
@@ -47,6 +70,23 @@ async def get_item_by_code(code: str, db: AsyncSession = Depends(get_db)):
     
     return item[0]
 
+@router.get("/code/{code}/stats", response_model=CurrencyStats)
+async def get_item_stats(code: str):
+    """
+    Скользящие индикаторы по коду валюты за 1h/24h/7d:
+    среднее, волатильность (стандартное отклонение) и процент изменения.
+    Отвечает из памяти, без запроса к БД.
+    """
+    stats = rolling_stats.get(code)
+    
+    if not stats:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"No stats for currency with code '{code}'"
+        )
+    
+    return stats
+
 @router.post("/", response_model=ItemResponse, status_code=201)
 async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db)):
     """Создать новый item"""
@@ -54,9 +94,12 @@ async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db)):
     db.add(new_item)
     await db.commit() 
     await db.refresh(new_item)  
+    rolling_stats.add(new_item.code, new_item.id, new_item.value, new_item.timestamp)
+    change_log.record(new_item.id, "create", new_item.code)
     
     from app.websocket import manager
     from app.nats_client import nats_client
+    from app.alerts import alert_engine
     from datetime import datetime
     
     # Уведомление через WebSocket
@@ -65,6 +108,7 @@ async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db)):
         "item_id": new_item.id,
         "name": new_item.name,
         "value": new_item.value,
+        "stats": rolling_stats.get(new_item.code),
         "timestamp": datetime.now().isoformat()
     })
     
@@ -80,6 +124,9 @@ async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db)):
         "timestamp": datetime.now().isoformat()
     })
     
+    # Проверка оповещений по новому курсу
+    await alert_engine.check_rate(new_item.code, new_item.value)
+    
     return new_item
 
 @router.patch("/{item_id}", response_model=ItemResponse)
@@ -99,15 +146,21 @@ async def update_item(item_id: int, item_update: ItemUpdate, db: AsyncSession =
     await db.commit()
     await db.refresh(item)
     
+    if "value" in update_data:
+        rolling_stats.update(item.code, item.id, item.value)
+    change_log.record(item.id, "update", item.code)
+    
     # Уведомления
     from app.websocket import manager
     from app.nats_client import nats_client
+    from app.alerts import alert_engine
     
     await manager.broadcast({
         "event": "item_updated",
         "item_id": item.id,
         "name": item.name,
         "value": item.value,
+        "stats": rolling_stats.get(item.code),
         "timestamp": datetime.now().isoformat()
     })
     
@@ -121,6 +174,11 @@ async def update_item(item_id: int, item_update: ItemUpdate, db: AsyncSession =
         "timestamp": datetime.now().isoformat()
     })
     
+    # Изменение значения самой новой записи - это изменение текущего курса.
+    # Правка исторических записей оповещения и базовый курс не затрагивает.
+    if "value" in update_data and rolling_stats.is_latest(item.code, item.id):
+        await alert_engine.check_rate(item.code, item.value)
+    
     return item
 
 @router.delete("/{item_id}", status_code=204)
@@ -132,16 +190,25 @@ async def delete_item(item_id: int, db: AsyncSession = Depends(get_db)):
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
+    code = item.code
     await db.delete(item)
     await db.commit()
+    rolling_stats.remove(code, item_id)
+    change_log.record(item_id, "delete", code)
     
     # Уведомления
     from app.websocket import manager
     from app.nats_client import nats_client
+    from app.alerts import alert_engine
+    
+    # Базой для above/below остается самая новая из оставшихся записей
+    alert_engine.reset_rate(code, rolling_stats.last_value(code))
     
     await manager.broadcast({
         "event": "item_deleted",
         "item_id": item_id,
+        "code": code,
+        "stats": rolling_stats.get(code),
         "timestamp": datetime.now().isoformat()
     })
     
@@ -6,6 +6,9 @@ from app.models import Item
 from sqlmodel import select
 from app.websocket import manager
 from app.nats_client import nats_client
+from app.alerts import alert_engine
+from app.stats import rolling_stats
+from app.changes import change_log
 import json
 
 async def fetch_currency_rates():
@@ -58,6 +61,7 @@ async def update_currency_rates():
     if rates:
         async with AsyncSessionLocal() as db:
             added_count = 0
+            new_items = []
             
             for rate_data in rates:
                 stmt = select(Item).where(
@@ -69,6 +73,10 @@ async def update_currency_rates():
 
                 last_item = result.first()
                 
+                # Последний сохраненный курс - база для проверки пересечения порогов
+                if last_item:
+                    alert_engine.seed_rate(rate_data["currency_code"], last_item[0].value)
+                
                 if not last_item or abs(last_item[0].value - rate_data["rate"]) > 0.001:
                     new_item = Item(
                         name=rate_data["currency_name"],
@@ -78,6 +86,7 @@ async def update_currency_rates():
                         category="currency"
                     )
                     db.add(new_item)
+                    new_items.append(new_item)
                     added_count += 1
                     print(f"   Добавлен курс: {rate_data['currency_code']} = {rate_data['rate']}")
             
@@ -85,12 +94,21 @@ async def update_currency_rates():
                 await db.commit()
                 print(f"[Фоновая задача] Добавлено {added_count} items (валют)")
                 
+                for item in new_items:
+                    rolling_stats.add(item.code, item.id, item.value, item.timestamp)
+                    change_log.record(item.id, "background_insert", item.code)
+                
+                # Проверяем оповещения только по изменившимся валютам
+                for item in new_items:
+                    await alert_engine.check_rate(item.code, item.value)
+                
                 # Отправляем уведомление через WebSocket
                 await manager.broadcast({
                     "event": "background_task_completed",
                     "message": f"Добавлено {added_count} валют как items",
                     "timestamp": datetime.now().isoformat(),
-                    "items_count": added_count
+                    "items_count": added_count,
+                    "stats": {item.code: rolling_stats.get(item.code) for item in new_items}
                 })
                 
                 # Публикуем событие в NATS
@@ -0,0 +1,79 @@
+"""
+Журнал изменений items для REST-клиентов без WebSocket.
+
+Каждое создание, изменение, удаление и вставка фоновой задачей получает
+монотонно растущую версию. Журнал хранится в памяти и ограничен по
+размеру; если клиент отстал сильнее или сервер перезапускался,
+ответ содержит reset=true и клиенту нужно заново загрузить GET /items/.
+
+Нумерация версий начинается с времени запуска процесса в микросекундах,
+поэтому версии разных запусков не пересекаются (для пересечения запуск
+должен был бы записывать больше одного изменения в микросекунду):
+курсор от предыдущего запуска меньше начала текущего журнала и получает
+reset=true. Значения остаются меньше 2**53 и точно передаются в JSON.
+"""
+
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Deque, List, Optional, Set, Tuple
+import asyncio
+import time
+
+MAX_CHANGES = 10000
+
+
+class ChangeLog:
+    def __init__(self, maxlen: int = MAX_CHANGES):
+        # Смещение на время запуска делает версии уникальными для каждого запуска
+        self.version = int(time.time() * 1_000_000)
+        self.entries: Deque[dict] = deque(maxlen=maxlen)
+        self._waiters: Set[asyncio.Future] = set()
+
+    def record(self, item_id: int, operation: str, code: Optional[str] = None) -> int:
+        """Добавляет запись в журнал и будит ожидающие long-poll запросы"""
+        self.version += 1
+        self.entries.append({
+            "version": self.version,
+            "item_id": item_id,
+            "operation": operation,
+            "code": code,
+            "timestamp": datetime.now().isoformat()
+        })
+
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+        return self.version
+
+    def since(self, version: int) -> Tuple[List[dict], bool]:
+        """
+        Изменения с версией больше version.
+        Второе значение - reset: версия клиента вне сохраненного журнала.
+        """
+        if version > self.version:
+            return [], True
+        if version == self.version:
+            return [], False
+
+        first = self.entries[0]["version"] if self.entries else self.version + 1
+        if version < first - 1:
+            return [], True
+
+        # Версии в журнале идут подряд, поэтому смещение вычисляется напрямую
+        return list(islice(self.entries, version - first + 1, None)), False
+
+    async def wait(self, version: int, timeout: float):
+        """Ждет изменений новее version не дольше timeout секунд"""
+        if timeout <= 0 or self.version != version:
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            self._waiters.discard(waiter)
+
+change_log = ChangeLog()
@@ -8,9 +8,11 @@ Currency Tracker API - Main Application File
 5. Асинхронная работа с SQLite БД
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import asyncio
+from sqlalchemy import text
 from sqlmodel import SQLModel
 from datetime import datetime
 import json  
@@ -19,7 +21,73 @@ from app.database import engine
 from app.background import background_worker
 from app.nats_client import nats_client
 from app.websocket import manager
-from app.api import items, tasks
+from app.stats import rolling_stats
+from app.alerts import alert_engine
+from app.api import items, tasks, alerts
+
+# Таймауты (секунды) для шагов запуска и проверок здоровья
+DB_INIT_TIMEOUT = 10
+STATS_SEED_TIMEOUT = 10
+NATS_CONNECT_TIMEOUT = 2
+NATS_RECONNECT_WAIT = 2
+HEALTH_CHECK_TIMEOUT = 2
+SHUTDOWN_TIMEOUT = 5
+
+async def nats_message_handler(msg):
+    """
+    Обработчик сообщений из NATS канала items.updates.
+    Соответствует требованию ТЗ: "при получении сообщения извне — логировать"
+    """
+    try:
+        data = json.loads(msg.data.decode())
+        print(f"[NATS] Получено из {msg.subject}: {data.get('type', 'unknown')}")
+        
+        if data.get('type') == 'external_command':
+            print(f"[NATS] Внешняя команда: {data}")
+            
+    except Exception as e:
+        print(f"[NATS] Ошибка обработки сообщения: {e}")
+
+async def init_db():
+    """Создание таблиц в БД"""
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    print("Таблицы созданы")
+
+async def seed_from_db(name: str, seed):
+    """Загрузка состояния из БД с таймаутом; при ошибке старт продолжается"""
+    try:
+        await asyncio.wait_for(seed(), timeout=STATS_SEED_TIMEOUT)
+    except Exception as e:
+        print(f"[{name}] Не удалось загрузить данные из БД: {e!r}")
+
+async def connect_nats():
+    """
+    Подключение к NATS в фоне. Повторные попытки (каждые NATS_RECONNECT_WAIT с)
+    выполняет сам nats-py, поэтому задача ждет до первого успешного подключения.
+    Не блокирует запуск приложения: до подключения публикации пропускаются.
+    """
+    try:
+        await nats_client.connect(
+            connect_timeout=NATS_CONNECT_TIMEOUT,
+            reconnect_time_wait=NATS_RECONNECT_WAIT
+        )
+        print("Подключено к NATS серверу")
+        
+        await nats_client.subscribe("items.updates", nats_message_handler)
+        print("Подписка на канал 'items.updates' создана")
+    except Exception as e:
+        print(f"[NATS] Не удалось подключиться: {e!r}")
+
+async def cancel_task(task: asyncio.Task):
+    """Отменяет задачу и ждет ее завершения не дольше SHUTDOWN_TIMEOUT"""
+    task.cancel()
+    try:
+        await asyncio.wait_for(task, timeout=SHUTDOWN_TIMEOUT)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        pass
+    except Exception as e:
+        print(f"Ошибка при остановке задачи: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -32,42 +100,27 @@ async def lifespan(app: FastAPI):
     print("ЗАПУСК CURRENCY TRACKER API")
     print("="*60)
     
-    # 1. Создаем таблицы в БД
-    print("Создание таблиц в базе данных...")
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
-    print("Таблицы созданы")
+    # 1. Подключение к NATS идет в фоне и не задерживает старт
+    print("Подключение к NATS (в фоне)...")
+    app.state.nats_task = asyncio.create_task(connect_nats())
     
-    # 2. Подключаемся к NATS
-    print("\nПодключение к NATS...")
+    # 2. Создаем таблицы в БД (с ограничением по времени)
+    print("Создание таблиц в базе данных...")
     try:
-        await nats_client.connect()
-        print("Подключено к NATS серверу")
-        
-        async def nats_message_handler(msg):
-            """
-            Обработчик сообщений из NATS канала items.updates.
-            Соответствует требованию ТЗ: "при получении сообщения извне — логировать"
-            """
-            try:
-                data = json.loads(msg.data.decode())
-                print(f"[NATS] Получено из {msg.subject}: {data.get('type', 'unknown')}")
-                
-                if data.get('type') == 'external_command':
-                    print(f"[NATS] Внешняя команда: {data}")
-                    
-            except Exception as e:
-                print(f"[NATS] Ошибка обработки сообщения: {e}")
-        
-        await nats_client.subscribe("items.updates", nats_message_handler)
-        print(" Подписка на канал 'items.updates' создана")
-        
-    except Exception as e:
-        print(f" Не удалось подключиться к NATS: {e}")
-        print("   Убедитесь, что NATS сервер запущен: docker-compose up -d")
+        await asyncio.wait_for(init_db(), timeout=DB_INIT_TIMEOUT)
+    except BaseException:
+        await cancel_task(app.state.nats_task)
+        raise
+    
+    # 3. Параллельно заполняем буферы индикаторов и базовые курсы оповещений
+    #    до запуска фоновой задачи
+    await asyncio.gather(
+        seed_from_db("Stats", rolling_stats.seed),
+        seed_from_db("Alerts", alert_engine.seed)
+    )
     
     print("\nЗапуск фоновой задачи...")
-    task = asyncio.create_task(background_worker())
+    app.state.worker_task = asyncio.create_task(background_worker())
     print("Фоновая задача запущена (каждые 5 минут)")
     
     print("\n" + "="*60)
@@ -86,7 +139,10 @@ async def lifespan(app: FastAPI):
     print("="*60)
     
     print("Остановка фоновой задачи...")
-    task.cancel()
+    await asyncio.gather(
+        cancel_task(app.state.worker_task),
+        cancel_task(app.state.nats_task)
+    )
 
     print("Закрытие соединения с NATS...")
     await nats_client.close()
@@ -116,6 +172,7 @@ app = FastAPI(
 # ==================== REST API РОУТЕРЫ ====================
 app.include_router(items.router) 
 app.include_router(tasks.router)  
+app.include_router(alerts.router)
 
 # ==================== WEBSOCKET ENDPOINT ====================
 @app.websocket("/ws/items")
@@ -126,17 +183,22 @@ async def websocket_endpoint(websocket: WebSocket):
     Клиенты получают уведомления:
     - При создании/изменении/удалении items
     - При выполнении фоновой задачи
+
+    Кодировка выбирается при подключении: query-параметр ?encoding=
+    или подпротокол Sec-WebSocket-Protocol (json, json-deflate, msgpack).
     """
-    # Подключаем клиента через менеджер
-    await manager.connect(websocket)
+    # Подключаем клиента через менеджер (кодировка: ?encoding= или подпротокол)
+    if not await manager.connect(websocket):
+        return
     
     try:
         # Отправляем приветственное сообщение
-        await websocket.send_json({
+        await manager.send(websocket, {
             "event": "connected",
             "message": "Подключено к каналу уведомлений Currency Tracker",
             "timestamp": datetime.now().isoformat(),
-            "channels": ["items.updates", "background_tasks"]
+            "channels": ["items.updates", "background_tasks"],
+            "encoding": manager.encodings[websocket]
         })
         
         print(f"[WebSocket] Новое подключение: {websocket.client}")
@@ -146,7 +208,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 data = await websocket.receive_text()
                 
                 if data == "ping":
-                    await websocket.send_json({
+                    await manager.send(websocket, {
                         "event": "pong",
                         "timestamp": datetime.now().isoformat()
                     })
@@ -161,7 +223,7 @@ async def websocket_endpoint(websocket: WebSocket):
                         result = await db.execute(select(Item))
                         items_count = len(result.scalars().all())
                     
-                    await websocket.send_json({
+                    await manager.send(websocket, {
                         "event": "status",
                         "total_items": items_count,
                         "active_connections": len(manager.active_connections),
@@ -170,7 +232,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 # Обработка других сообщений
                 else:
-                    await websocket.send_json({
+                    await manager.send(websocket, {
                         "event": "echo",
                         "message": f"Получено: {data}",
                         "timestamp": datetime.now().isoformat()
@@ -193,34 +255,101 @@ async def websocket_endpoint(websocket: WebSocket):
         print(f"[WebSocket]  Очистка подключения: {websocket.client}")
 
 # ==================== HEALTH CHECK ====================
+async def check_database() -> str:
+    """Реальная проверка БД запросом SELECT 1"""
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    try:
+        await asyncio.wait_for(ping(), timeout=HEALTH_CHECK_TIMEOUT)
+        return "connected"
+    except asyncio.TimeoutError:
+        return "timeout"
+    except Exception as e:
+        print(f"[Health] Ошибка БД: {e}")
+        return "error"
+
+def check_nats() -> str:
+    return "connected" if nats_client.is_connected else "disconnected"
+
+def check_worker(app: FastAPI) -> str:
+    task = getattr(app.state, "worker_task", None)
+    if task is None:
+        return "not_started"
+    if task.cancelled():
+        return "cancelled"
+    if task.done():
+        return "failed" if task.exception() else "stopped"
+    return "running"
+
+async def collect_components(app: FastAPI) -> dict:
+    return {
+        "api": "operational",
+        "database": await check_database(),
+        "websocket": "ready",
+        "nats": check_nats(),
+        "background_task": check_worker(app)
+    }
+
+@app.get("/health/live")
+async def liveness(request: Request):
+    """
+    Liveness-проба: процесс отвечает и фоновая задача не упала.
+    Внешние зависимости (БД, NATS) не проверяются.
+    """
+    worker = check_worker(request.app)
+    alive = worker in ("running", "not_started")
+    return JSONResponse(
+        status_code=200 if alive else 503,
+        content={
+            "status": "alive" if alive else "dead",
+            "background_task": worker,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+@app.get("/health/ready")
+async def readiness(request: Request):
+    """
+    Readiness-проба: БД отвечает и фоновая задача работает.
+    Отсутствие NATS не снимает готовность (status: degraded),
+    так как подключение к нему восстанавливается в фоне.
+    """
+    components = await collect_components(request.app)
+    ready = components["database"] == "connected" and components["background_task"] == "running"
+    
+    if not ready:
+        status = "not_ready"
+    elif components["nats"] != "connected":
+        status = "degraded"
+    else:
+        status = "ready"
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": status,
+            "timestamp": datetime.now().isoformat(),
+            "components": components
+        }
+    )
+
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """
     Проверка работоспособности сервиса.
     Возвращает статус всех компонентов системы.
     """
-    status = {
-        "status": "healthy",
+    components = await collect_components(request.app)
+    healthy = components["database"] == "connected" and components["background_task"] == "running"
+    
+    return {
+        "status": "healthy" if healthy else "unhealthy",
         "service": "Currency Tracker API",
         "timestamp": datetime.now().isoformat(),
-        "components": {
-            "api": "operational",
-            "database": "connected",
-            "websocket": "ready",
-            "background_task": "running"
-        }
+        "components": components
     }
-    
-    # Проверяем NATS соединение
-    try:
-        if nats_client.nc and nats_client.nc.is_connected:
-            status["components"]["nats"] = "connected"
-        else:
-            status["components"]["nats"] = "disconnected"
-    except:
-        status["components"]["nats"] = "unknown"
-    
-    return status
 
 # ==================== ROOT ENDPOINT ====================
 @app.get("/")
@@ -236,7 +365,9 @@ async def root():
         "endpoints": {
             "items": {
                 "GET /items/": "Список всех курсов валют",
+                "GET /items/changes?since=&wait=": "Журнал изменений с long-poll",
                 "GET /items/{id}": "Получить курс по ID",
+                "GET /items/code/{code}/stats": "Скользящие индикаторы 1h/24h/7d",
                 "POST /items/": "Создать новую запись",
                 "PATCH /items/{id}": "Обновить запись",
                 "DELETE /items/{id}": "Удалить запись"
@@ -244,8 +375,15 @@ async def root():
             "tasks": {
                 "POST /tasks/run": "Запустить фоновую задачу вручную"
             },
+            "alerts": {
+                "GET /alerts/": "Список активных оповещений",
+                "POST /alerts/": "Зарегистрировать оповещение (above/below/change)",
+                "DELETE /alerts/{id}": "Удалить оповещение"
+            },
             "system": {
                 "GET /health": "Проверка здоровья системы",
+                "GET /health/live": "Liveness-проба",
+                "GET /health/ready": "Readiness-проба (БД, NATS, фоновая задача)",
                 "GET /": "Эта страница"
             }
         }
@@ -5,11 +5,54 @@ from typing import Optional, Callable
 class NATSClient:
     def __init__(self):
         self.nc: Optional[nats.NATS] = None
+        self.failed_attempts = 0
         
-    async def connect(self, servers="nats://localhost:4222"):
-        self.nc = await nats.connect(servers)
+    async def connect(self, servers="nats://localhost:4222",
+                      connect_timeout: float = 2, reconnect_time_wait: float = 2):
+        """
+        Подключение с неограниченным числом попыток (каждые reconnect_time_wait с).
+        При недоступном сервере не завершается до успешного подключения,
+        поэтому вызывается из фоновой задачи. Переподключения после обрыва
+        nats-py выполняет сам с теми же параметрами.
+        """
+        self.failed_attempts = 0
+        self.nc = await nats.connect(
+            servers,
+            connect_timeout=connect_timeout,
+            max_reconnect_attempts=-1,
+            reconnect_time_wait=reconnect_time_wait,
+            error_cb=self._on_error,
+            disconnected_cb=self._on_disconnected,
+            reconnected_cb=self._on_reconnected
+        )
+        self.failed_attempts = 0
         return self.nc
     
+    async def _on_error(self, e: Exception):
+        # Одна строка на ошибку вместо трейсбэка от error_cb по умолчанию.
+        # Попытками подключения считаются только ошибки без соединения,
+        # остальное (slow consumer, права, протокол) логируется отдельно.
+        if self.is_connected:
+            print(f"[NATS] Ошибка: {type(e).__name__}: {e}")
+            return
+        
+        self.failed_attempts += 1
+        print(f"[NATS] Ошибка соединения (попытка {self.failed_attempts}): "
+              f"{type(e).__name__}: {e}")
+        if self.failed_attempts == 1:
+            print("   Убедитесь, что NATS сервер запущен: docker-compose up -d")
+    
+    async def _on_disconnected(self):
+        print("[NATS] Соединение потеряно, переподключение...")
+    
+    async def _on_reconnected(self):
+        self.failed_attempts = 0
+        print("[NATS] Соединение восстановлено")
+    
+    @property
+    def is_connected(self) -> bool:
+        return bool(self.nc and self.nc.is_connected)
+    
     async def publish(self, subject: str, message: dict):
         if self.nc:
             await self.nc.publish(subject, json.dumps(message).encode())
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 class ItemCreate(BaseModel):
     name: str
@@ -30,4 +30,52 @@ class ItemResponse(BaseModel):
 
 class TaskResponse(BaseModel):
     message: str
-    status: str
\ No newline at end of file
+    status: str
+
+class ChangeEntry(BaseModel):
+    version: int
+    item_id: int
+    operation: str
+    code: Optional[str] = None
+    timestamp: datetime
+
+
+class ChangesResponse(BaseModel):
+    version: int
+    reset: bool = False
+    changes: List[ChangeEntry]
+
+
+class WindowStats(BaseModel):
+    count: int
+    moving_average: Optional[float] = None
+    volatility: Optional[float] = None
+    change_percent: Optional[float] = None
+
+
+class CurrencyStats(BaseModel):
+    code: str
+    last_value: Optional[float] = None
+    last_timestamp: Optional[datetime] = None
+    windows: Dict[str, WindowStats]
+
+
+class AlertCreate(BaseModel):
+    client_id: str
+    code: str
+    condition: Literal["above", "below", "change"]
+    threshold: float
+    window_seconds: int = 3600
+
+
+class AlertResponse(BaseModel):
+    id: int
+    client_id: str
+    code: str
+    condition: str
+    threshold: float
+    window_seconds: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
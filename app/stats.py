@@ -0,0 +1,310 @@
+"""
+Скользящие индикаторы курсов по каждому Item.code.
+
+Для каждой валюты хранится кольцевой буфер на массивах (array) с точками
+(id, время, значение). Для окон 1h/24h/7d инкрементально поддерживаются
+сумма и сумма квадратов, поэтому скользящее среднее, волатильность
+(стандартное отклонение курса) и процент изменения считаются за O(1)
+без обращения к SQLite.
+"""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import math
+import time
+
+from sqlmodel import select
+
+from app.database import AsyncSessionLocal
+from app.models import Item
+
+WINDOWS = {
+    "1h": 3600,
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600
+}
+INITIAL_CAPACITY = 1024
+
+
+def to_epoch(dt: datetime) -> float:
+    """Item.timestamp хранится как naive UTC"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class _Window:
+    __slots__ = ("name", "seconds", "head", "total", "total_sq")
+
+    def __init__(self, name: str, seconds: int, head: int = 0):
+        self.name = name
+        self.seconds = seconds
+        self.head = head  # абсолютный индекс самой старой точки окна
+        self.total = 0.0
+        self.total_sq = 0.0
+
+
+class RollingSeries:
+    """Кольцевой буфер точек одной валюты с агрегатами по окнам"""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.capacity = capacity
+        self.ids = array("q", [0]) * capacity
+        self.times = array("d", [0.0]) * capacity
+        self.values = array("d", [0.0]) * capacity
+        # Абсолютные индексы: [start, end) - хранимые точки
+        self.start = 0
+        self.end = 0
+        self.now = 0.0  # самое позднее время, на которое выполнялось вытеснение
+        self.windows = [_Window(name, seconds) for name, seconds in WINDOWS.items()]
+        self.last_id: Optional[int] = None
+        self.last_value: Optional[float] = None
+        self.last_time: Optional[float] = None
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        ids = array("q", [0]) * capacity
+        times = array("d", [0.0]) * capacity
+        values = array("d", [0.0]) * capacity
+        for i in range(self.start, self.end):
+            src, dst = i % self.capacity, i % capacity
+            ids[dst] = self.ids[src]
+            times[dst] = self.times[src]
+            values[dst] = self.values[src]
+        self.capacity = capacity
+        self.ids, self.times, self.values = ids, times, values
+
+    def evict(self, now: float):
+        """Исключает из окон точки, вышедшие за их границы"""
+        self.now = max(self.now, now)
+        for w in self.windows:
+            cutoff = now - w.seconds
+            while w.head < self.end and self.times[w.head % self.capacity] < cutoff:
+                value = self.values[w.head % self.capacity]
+                w.total -= value
+                w.total_sq -= value * value
+                w.head += 1
+        # Самое длинное окно определяет, какие точки еще нужны
+        self.start = min(w.head for w in self.windows)
+
+    def append(self, item_id: int, value: float, timestamp: float):
+        if self.end > self.start and timestamp < self.times[(self.end - 1) % self.capacity]:
+            self._insert_sorted(item_id, value, timestamp)
+            return
+
+        self.evict(timestamp)
+        if self.end - self.start == self.capacity:
+            self._grow()
+
+        i = self.end % self.capacity
+        self.ids[i] = item_id
+        self.times[i] = timestamp
+        self.values[i] = value
+        self.end += 1
+
+        for w in self.windows:
+            w.total += value
+            w.total_sq += value * value
+
+        self.last_id = item_id
+        self.last_value = value
+        self.last_time = timestamp
+
+    def _insert_sorted(self, item_id: int, value: float, timestamp: float):
+        """
+        Вставка точки старше последней (O(n)). Бывает, когда время Item
+        задано до commit, а другой запрос успел добавить более новую точку.
+        Времена в буфере остаются упорядоченными, как требуют evict и поиск.
+        """
+        if self.end - self.start == self.capacity:
+            self._grow()
+
+        i = self._lower_bound(timestamp, strict=True)
+        for j in range(self.end, i, -1):
+            src, dst = (j - 1) % self.capacity, j % self.capacity
+            self.ids[dst] = self.ids[src]
+            self.times[dst] = self.times[src]
+            self.values[dst] = self.values[src]
+        self.ids[i % self.capacity] = item_id
+        self.times[i % self.capacity] = timestamp
+        self.values[i % self.capacity] = value
+        self.end += 1
+
+        for w in self.windows:
+            w.head = self._lower_bound(self.now - w.seconds)
+        self.start = min(w.head for w in self.windows)
+        self._recompute()
+
+    def _lower_bound(self, cutoff: float, strict: bool = False) -> int:
+        """
+        Абсолютный индекс первой точки с временем >= cutoff
+        (> cutoff при strict) в [start, end), бинарный поиск.
+        """
+        lo, hi = self.start, self.end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = self.times[mid % self.capacity]
+            if t < cutoff or (strict and t == cutoff):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def first_value_since(self, cutoff: float) -> Optional[float]:
+        """Значение первой точки с временем >= cutoff (бинарный поиск)"""
+        i = self._lower_bound(cutoff)
+        if i == self.end:
+            return None
+        return self.values[i % self.capacity]
+
+    def _find(self, item_id: int) -> Optional[int]:
+        for i in range(self.end - 1, self.start - 1, -1):
+            if self.ids[i % self.capacity] == item_id:
+                return i
+        return None
+
+    def _recompute(self):
+        for w in self.windows:
+            w.total = 0.0
+            w.total_sq = 0.0
+            for i in range(w.head, self.end):
+                value = self.values[i % self.capacity]
+                w.total += value
+                w.total_sq += value * value
+
+        if self.end > self.start:
+            last = (self.end - 1) % self.capacity
+            self.last_id = self.ids[last]
+            self.last_value = self.values[last]
+            self.last_time = self.times[last]
+
+    def update(self, item_id: int, value: float) -> bool:
+        """Изменяет значение точки (O(n), только при PATCH)"""
+        i = self._find(item_id)
+        if i is None:
+            return False
+        self.values[i % self.capacity] = value
+        self._recompute()
+        return True
+
+    def remove(self, item_id: int) -> bool:
+        """Удаляет точку, сдвигая более новые (O(n), только при DELETE)"""
+        i = self._find(item_id)
+        if i is None:
+            return False
+        for j in range(i, self.end - 1):
+            src, dst = (j + 1) % self.capacity, j % self.capacity
+            self.ids[dst] = self.ids[src]
+            self.times[dst] = self.times[src]
+            self.values[dst] = self.values[src]
+        self.end -= 1
+        for w in self.windows:
+            if w.head > i:
+                w.head -= 1
+        self.start = min(w.head for w in self.windows)
+
+        if self.end == self.start:
+            self.last_id = None
+            self.last_value = None
+            self.last_time = None
+        self._recompute()
+        return True
+
+    def snapshot(self, now: float) -> dict:
+        self.evict(now)
+        windows = {}
+        for w in self.windows:
+            count = self.end - w.head
+            if count == 0:
+                windows[w.name] = {
+                    "count": 0,
+                    "moving_average": None,
+                    "volatility": None,
+                    "change_percent": None
+                }
+                continue
+
+            mean = w.total / count
+            variance = max(w.total_sq / count - mean * mean, 0.0)
+            first = self.values[w.head % self.capacity]
+            last = self.values[(self.end - 1) % self.capacity]
+            windows[w.name] = {
+                "count": count,
+                "moving_average": mean,
+                "volatility": math.sqrt(variance),
+                "change_percent": (last - first) / first * 100 if first else None
+            }
+
+        return {
+            "last_value": self.last_value,
+            "last_timestamp": (
+                datetime.utcfromtimestamp(self.last_time).isoformat()
+                if self.last_time is not None else None
+            ),
+            "windows": windows
+        }
+
+
+class RollingStats:
+    def __init__(self):
+        self.series: Dict[str, RollingSeries] = {}
+
+    def add(self, code: str, item_id: int, value: float, timestamp: datetime):
+        series = self.series.setdefault(code.upper(), RollingSeries())
+        series.append(item_id, value, to_epoch(timestamp))
+
+    def update(self, code: str, item_id: int, value: float):
+        series = self.series.get(code.upper())
+        if series:
+            series.update(item_id, value)
+
+    def remove(self, code: str, item_id: int):
+        series = self.series.get(code.upper())
+        if series:
+            series.remove(item_id)
+            if series.last_value is None:
+                del self.series[code.upper()]
+
+    def last_value(self, code: str) -> Optional[float]:
+        series = self.series.get(code.upper())
+        return series.last_value if series else None
+
+    def is_latest(self, code: str, item_id: int) -> bool:
+        """Является ли item самой новой точкой своей валюты"""
+        series = self.series.get(code.upper())
+        return series is not None and series.last_id == item_id
+
+    def first_value_since(self, code: str, cutoff: float) -> Optional[float]:
+        """Первый курс валюты не старше cutoff (история хранится за 7d)"""
+        series = self.series.get(code.upper())
+        if series is None:
+            return None
+        return series.first_value_since(cutoff)
+
+    def get(self, code: str) -> Optional[dict]:
+        """Индикаторы по валюте за O(1) (амортизированно)"""
+        code = code.upper()
+        series = self.series.get(code)
+        if series is None:
+            return None
+        return {"code": code, **series.snapshot(time.time())}
+
+    async def seed(self):
+        """Заполняет буферы из БД точками за самое длинное окно"""
+        cutoff = datetime.utcnow() - timedelta(seconds=max(WINDOWS.values()))
+        stmt = select(Item.id, Item.code, Item.value, Item.timestamp).where(
+            Item.timestamp >= cutoff
+        ).order_by(Item.timestamp, Item.id)
+
+        self.series.clear()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(stmt)
+            rows = result.all()
+
+        for item_id, code, value, timestamp in rows:
+            self.add(code, item_id, value, timestamp)
+
+        print(f"[Stats] Загружено {len(rows)} точек по {len(self.series)} валютам")
+
+rolling_stats = RollingStats()
@@ -1,41 +1,136 @@
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, List, Optional, Union
+import json
+import zlib
+import msgpack
+
+# Поддерживаемые кодировки сообщений:
+# json         - текстовые JSON кадры (по умолчанию)
+# json-deflate - JSON, сжатый zlib, в бинарных кадрах
+# msgpack      - MessagePack в бинарных кадрах
+ENCODINGS = ("json", "json-deflate", "msgpack")
+DEFAULT_ENCODING = "json"
+
+
+def select_encoding(websocket: WebSocket) -> Optional[str]:
+    """
+    Выбирает кодировку клиента при подключении.
+    Приоритет: query-параметр ?encoding=, затем Sec-WebSocket-Protocol.
+    Возвращает None, если запрошена неподдерживаемая кодировка.
+    """
+    requested = websocket.query_params.get("encoding")
+    if requested is not None:
+        return requested if requested in ENCODINGS else None
+
+    for subprotocol in websocket.scope.get("subprotocols", []):
+        if subprotocol in ENCODINGS:
+            return subprotocol
+
+    return DEFAULT_ENCODING
+
+
+def encode_message(message: dict, encoding: str) -> Union[str, bytes]:
+    """Кодирует сообщение в кадр для указанной кодировки"""
+    if encoding == "msgpack":
+        return msgpack.packb(message, use_bin_type=True)
+
+    text = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+    if encoding == "json-deflate":
+        return zlib.compress(text.encode("utf-8"))
+    return text
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self.encodings: Dict[WebSocket, str] = {}
+        # client_id -> подключения клиента (для адресной доставки, например alerts)
+        self.clients: Dict[str, List[WebSocket]] = {}
+        self.client_ids: Dict[WebSocket, str] = {}
 
     async def connect(self, websocket: WebSocket):
         print(f"[WebSocket Manager] Начало connect() для {websocket.client}")
-        await websocket.accept()
+        encoding = select_encoding(websocket)
+        if encoding is None:
+            print(f"[WebSocket Manager] Неподдерживаемая кодировка от {websocket.client}")
+            await websocket.close(code=1003)
+            return False
+
+        # Подтверждаем подпротокол, только если клиент сам его предложил
+        subprotocol = encoding if encoding in websocket.scope.get("subprotocols", []) else None
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
-        print(f"[WebSocket Manager] Подключение принято. Всего: {len(self.active_connections)}")
+        self.encodings[websocket] = encoding
+
+        client_id = websocket.query_params.get("client_id")
+        if client_id:
+            self.clients.setdefault(client_id, []).append(websocket)
+            self.client_ids[websocket] = client_id
+        print(f"[WebSocket Manager] Подключение принято ({encoding}). "
+              f"Всего: {len(self.active_connections)}")
         return True
 
     def disconnect(self, websocket: WebSocket):
         print(f"[WebSocket Manager] disconnect() для {websocket.client}")
+        self.encodings.pop(websocket, None)
+        client_id = self.client_ids.pop(websocket, None)
+        if client_id:
+            connections = self.clients.get(client_id, [])
+            if websocket in connections:
+                connections.remove(websocket)
+            if not connections:
+                self.clients.pop(client_id, None)
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
             print(f"[WebSocket Manager] Удален. Осталось: {len(self.active_connections)}")
 
+    async def _send_frame(self, websocket: WebSocket, frame: Union[str, bytes]):
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+
+    async def send(self, websocket: WebSocket, message: dict):
+        """Отправляет сообщение одному клиенту в его кодировке"""
+        encoding = self.encodings.get(websocket, DEFAULT_ENCODING)
+        await self._send_frame(websocket, encode_message(message, encoding))
+
+    async def send_to_client(self, client_id: str, message: dict):
+        """Отправляет сообщение всем подключениям клиента с указанным client_id"""
+        disconnected = []
+        for connection in list(self.clients.get(client_id, [])):
+            try:
+                await self.send(connection, message)
+            except Exception as e:
+                print(f"[WebSocket Manager] Ошибка отправки клиенту {client_id}: {e}")
+                disconnected.append(connection)
+
+        for conn in disconnected:
+            self.disconnect(conn)
+
     async def broadcast(self, message: dict):
         print(f"[WebSocket Manager] broadcast: {message.get('event', 'unknown')} "
               f"для {len(self.active_connections)} клиентов")
-        
+
         if not self.active_connections:
             print("[WebSocket Manager] Нет активных подключений!")
             return
-        
+
+        # Кодируем сообщение один раз на каждую кодировку, а не на каждого клиента
+        frames: Dict[str, Union[str, bytes]] = {}
         disconnected = []
         for i, connection in enumerate(self.active_connections):
+            encoding = self.encodings.get(connection, DEFAULT_ENCODING)
+            if encoding not in frames:
+                frames[encoding] = encode_message(message, encoding)
             try:
-                await connection.send_json(message)
+                await self._send_frame(connection, frames[encoding])
                 print(f"[WebSocket Manager] Отправлено клиенту #{i}")
             except Exception as e:
                 print(f"[WebSocket Manager] Ошибка отправки клиенту #{i}: {e}")
                 disconnected.append(connection)
-        
+
         for conn in disconnected:
             self.disconnect(conn)
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from itertools import count
+
+import pytest
+
+from app import alerts
+from app.alerts import AlertEngine
+from app.changes import ChangeLog
+from app.stats import RollingStats
+
+T0 = 1_700_000_000.0
+
+
+def to_datetime(seconds: float) -> datetime:
+    """Время T0 + seconds как aware datetime (для RollingStats.add)"""
+    return datetime.fromtimestamp(T0 + seconds, timezone.utc)
+
+
+@pytest.fixture
+def at():
+    return to_datetime
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """Пустые буферы индикаторов, подставленные и в движок оповещений"""
+    stats = RollingStats()
+    monkeypatch.setattr(alerts, "rolling_stats", stats)
+    return stats
+
+
+@pytest.fixture
+def engine(stats):
+    return AlertEngine()
+
+
+@pytest.fixture
+def rate(stats, engine):
+    """
+    Новый курс так же, как в write-путях: точка в буфер, затем проверка.
+    Возвращает ID сработавших оповещений.
+    """
+    ids = count(1)
+
+    def add(code: str, value: float, seconds: float = 0):
+        stats.add(code, next(ids), value, to_datetime(seconds))
+        triggered = engine.process_rate(code, value, now=T0 + seconds)
+        return [alert.id for alert, _ in triggered]
+
+    return add
+
+
+@pytest.fixture
+def change_log():
+    return ChangeLog(maxlen=5)
@@ -0,0 +1,91 @@
+import pytest
+
+from app.alerts import AlertAlreadyTriggered
+
+
+def test_above_fires_on_crossing_including_previous_boundary(engine, rate):
+    rate("USD", 100)
+    at_previous = engine.add("c", "USD", "above", 100)
+    inside = engine.add("c", "USD", "above", 100.5)
+    at_rate = engine.add("c", "USD", "above", 101)
+
+    assert rate("USD", 101) == [at_previous.id, inside.id]
+    assert [a.id for a in engine.get_alerts()] == [at_rate.id]
+
+
+def test_below_fires_on_crossing_including_previous_boundary(engine, rate):
+    rate("USD", 100)
+    at_previous = engine.add("c", "USD", "below", 100)
+    at_rate = engine.add("c", "USD", "below", 99)
+
+    assert rate("USD", 99) == [at_previous.id]
+    assert [a.id for a in engine.get_alerts()] == [at_rate.id]
+
+
+def test_no_previous_rate_fires_nothing(engine, rate):
+    engine.add("c", "USD", "above", 50)
+    assert rate("USD", 100) == []
+
+
+def test_alerts_are_one_shot_and_empty_buckets_pruned(engine, rate):
+    rate("USD", 100)
+    engine.add("c", "USD", "above", 105)
+
+    assert len(rate("USD", 110)) == 1
+    assert rate("USD", 100) == []
+    assert rate("USD", 110) == []
+    assert engine.above == {} and engine.alerts == {}
+
+
+def test_remove_prunes_buckets(engine):
+    alert = engine.add("c", "usd", "change", 1, 3600)
+
+    assert engine.remove(alert.id) is alert
+    assert engine.remove(alert.id) is None
+    assert engine.change == {}
+
+
+@pytest.mark.parametrize("condition, threshold", [("above", 80), ("below", 100)])
+def test_already_true_condition_is_rejected(engine, condition, threshold):
+    engine.seed_rate("EUR", 96)
+    with pytest.raises(AlertAlreadyTriggered):
+        engine.add("c", "EUR", condition, threshold)
+
+
+@pytest.mark.parametrize("condition", ["above", "below"])
+def test_threshold_equal_to_current_rate_is_accepted(engine, condition):
+    engine.seed_rate("EUR", 96)
+    assert engine.add("c", "EUR", condition, 96).code == "EUR"
+
+
+def test_change_window_must_be_a_stats_window(engine):
+    with pytest.raises(ValueError):
+        engine.add("c", "EUR", "change", 1, 1800)
+
+
+def test_change_uses_history_from_before_registration(engine, rate):
+    rate("EUR", 100, 0)
+    rate("EUR", 101, 600)
+    alert = engine.add("c", "EUR", "change", 1.5, 3600)
+
+    assert rate("EUR", 102, 1200) == [alert.id]
+
+
+def test_change_ignores_points_outside_window(engine, rate):
+    rate("EUR", 100, 0)
+    rate("EUR", 102, 3000)
+    engine.add("c", "EUR", "change", 1.5, 3600)
+
+    # База окна 1h - точка 102 (точка 100 старше часа)
+    assert rate("EUR", 103, 3601 + 60) == []
+
+
+def test_seed_rate_keeps_known_rate_and_reset_replaces_it(engine):
+    engine.seed_rate("usd", 90)
+    engine.seed_rate("USD", 95)
+    assert engine.last_rates == {"USD": 90}
+
+    engine.reset_rate("USD", 95)
+    assert engine.last_rates == {"USD": 95}
+    engine.reset_rate("USD", None)
+    assert engine.last_rates == {}
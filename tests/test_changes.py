@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from app.changes import ChangeLog
+
+
+def versions(changes):
+    return [c["version"] for c in changes]
+
+
+def test_since_returns_exact_delta(change_log):
+    base = change_log.version
+    for item_id in range(3):
+        change_log.record(item_id, "create", "USD")
+
+    assert change_log.since(base + 3) == ([], False)
+    changes, reset = change_log.since(base + 1)
+    assert not reset
+    assert versions(changes) == [base + 2, base + 3]
+    assert changes[0]["item_id"] == 1 and changes[0]["operation"] == "create"
+
+
+def test_oldest_retained_cursor_still_gets_delta(change_log):
+    base = change_log.version
+    for item_id in range(7):
+        change_log.record(item_id, "update")
+
+    # maxlen=5: в журнале версии base+3..base+7
+    changes, reset = change_log.since(base + 2)
+    assert not reset and versions(changes) == list(range(base + 3, base + 8))
+    assert change_log.since(base + 1) == ([], True)
+
+
+def test_unknown_cursors_get_reset(change_log):
+    assert change_log.since(0) == ([], True)
+    assert change_log.since(change_log.version + 1) == ([], True)
+
+
+def test_cursor_from_previous_run_gets_reset():
+    old = ChangeLog()
+    old.record(1, "create")
+    old.record(2, "create")
+    cursor = old.version
+
+    time.sleep(0.01)
+    new = ChangeLog()
+    for item_id in range(4):
+        new.record(item_id, "create")
+
+    assert new.since(cursor) == ([], True)
+
+
+def test_wait_wakes_on_record_and_times_out(change_log):
+    async def scenario():
+        version = change_log.version
+        loop = asyncio.get_running_loop()
+
+        started = loop.time()
+        await change_log.wait(version, 0.05)
+        assert loop.time() - started >= 0.04
+
+        loop.call_later(0.01, change_log.record, 1, "delete")
+        started = loop.time()
+        await change_log.wait(version, 5)
+        assert loop.time() - started < 1
+        assert versions(change_log.since(version)[0]) == [version + 1]
+
+    asyncio.run(scenario())
@@ -0,0 +1,117 @@
+import random
+import statistics
+
+import pytest
+
+from app.stats import WINDOWS, RollingSeries
+
+T0 = 0.0
+
+
+def brute_force(points, now):
+    """Индикаторы по отсортированному списку (time, value) напрямую"""
+    result = {}
+    for name, seconds in WINDOWS.items():
+        values = [v for t, v in sorted(points) if t >= now - seconds]
+        result[name] = values
+    return result
+
+
+def assert_matches(series, points, now):
+    snapshot = series.snapshot(now)
+    for name, values in brute_force(points, now).items():
+        window = snapshot["windows"][name]
+        assert window["count"] == len(values)
+        if values:
+            assert window["moving_average"] == pytest.approx(statistics.fmean(values))
+            assert window["volatility"] == pytest.approx(statistics.pstdev(values), abs=1e-6)
+            assert window["change_percent"] == pytest.approx(
+                (values[-1] - values[0]) / values[0] * 100
+            )
+        assert series.first_value_since(now - WINDOWS[name]) == (values[0] if values else None)
+
+
+def test_window_eviction():
+    series = RollingSeries(capacity=4)
+    series.append(1, 100, T0)
+    series.append(2, 110, T0 + 1800)
+
+    snapshot = series.snapshot(T0 + 3600 + 1)
+    assert snapshot["windows"]["1h"]["count"] == 1
+    assert snapshot["windows"]["1h"]["change_percent"] == 0
+    assert snapshot["windows"]["24h"]["count"] == 2
+    assert snapshot["windows"]["24h"]["change_percent"] == pytest.approx(10)
+
+
+def test_first_value_since_is_inclusive():
+    series = RollingSeries()
+    series.append(1, 100, T0)
+    series.append(2, 101, T0 + 10)
+
+    assert series.first_value_since(T0) == 100
+    assert series.first_value_since(T0 + 1) == 101
+    assert series.first_value_since(T0 + 11) is None
+
+
+def test_grow_preserves_order_across_wraparound():
+    series = RollingSeries(capacity=4)
+    points = []
+    for i in range(20):
+        # Интервал 1h: окно 1h вытесняет точки, буфер несколько раз оборачивается
+        points.append((T0 + i * 3600, 100 + i))
+        series.append(i + 1, 100 + i, T0 + i * 3600)
+
+    assert series.capacity >= 16
+    assert_matches(series, points, T0 + 19 * 3600)
+
+
+def test_late_point_is_inserted_in_order():
+    series = RollingSeries(capacity=4)
+    series.append(1, 100, T0)
+    series.append(3, 102, T0 + 20)
+    series.append(2, 101, T0 + 10)
+
+    times = [series.times[i % series.capacity] for i in range(series.start, series.end)]
+    assert times == sorted(times)
+    assert series.last_id == 3 and series.last_value == 102
+    assert_matches(series, [(T0, 100), (T0 + 10, 101), (T0 + 20, 102)], T0 + 20)
+
+
+def test_remove_and_update_keep_last_point(stats, at):
+    stats.add("usd", 1, 100, at(0))
+    stats.add("USD", 2, 105, at(10))
+
+    assert stats.is_latest("USD", 2)
+    stats.update("USD", 2, 106)
+    assert stats.last_value("USD") == 106
+
+    stats.remove("USD", 2)
+    assert stats.is_latest("USD", 1) and stats.last_value("USD") == 100
+
+    stats.remove("USD", 1)
+    assert stats.get("USD") is None and stats.last_value("USD") is None
+
+
+def test_matches_brute_force_with_updates_removes_and_late_points():
+    rnd = random.Random(7)
+    series = RollingSeries(capacity=4)
+    points = {}
+    now = T0
+    for item_id in range(1, 2000):
+        now += rnd.uniform(60, 900)
+        timestamp = now - rnd.uniform(0, 2000) if rnd.random() < 0.2 else now
+        value = rnd.uniform(90, 110)
+        series.append(item_id, value, timestamp)
+        points[item_id] = (timestamp, value)
+
+        roll = rnd.random()
+        if roll < 0.02:
+            victim = rnd.choice(list(points)[-300:])
+            del points[victim]
+            assert series.remove(victim)
+        elif roll < 0.04:
+            target = rnd.choice(list(points)[-300:])
+            points[target] = (points[target][0], value + 1)
+            assert series.update(target, value + 1)
+
+    assert_matches(series, list(points.values()), now)